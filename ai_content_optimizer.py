@@ -1,10 +1,18 @@
 import os
 from openai import OpenAI
 import json
+import resilience
 
 # Initialize OpenAI client
 client = None
 
+# Per-request timeout in seconds; the SDK default of 600s would tie up a worker
+REQUEST_TIMEOUT = 30
+
+# Retries on top of the first attempt, so one call is bounded to roughly
+# (OPENAI_RETRIES + 1) * REQUEST_TIMEOUT plus backoff
+OPENAI_RETRIES = 2
+
 def initialize_openai():
     """Initialize the OpenAI client with API key from environment or config"""
     global client
@@ -21,7 +29,8 @@ def initialize_openai():
             pass
             
     if api_key:
-        client = OpenAI(api_key=api_key)
+        # Retries are handled by the shared resilience layer, not the SDK
+        client = OpenAI(api_key=api_key, max_retries=0, timeout=REQUEST_TIMEOUT)
         return True
     return False
 
@@ -52,7 +61,11 @@ def optimize_caption(original_caption, subreddit, post_title, optimization_level
     personality = personality_map.get(optimization_level, personality_map['moderate'])
     
     try:
-        completion = client.chat.completions.create(
+        completion = resilience.call_with_retry(
+            client.chat.completions.create,
+            host='openai',
+            retries=OPENAI_RETRIES,
+            retry_on=resilience.OPENAI_ERRORS,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": f"You are an expert Instagram content creator specializing in optimizing Reddit content for Instagram. {personality}"},
@@ -85,7 +98,11 @@ def generate_hashtags(subreddit, post_title, caption, count=10):
             return "#viral #trending #reddit"
     
     try:
-        completion = client.chat.completions.create(
+        completion = resilience.call_with_retry(
+            client.chat.completions.create,
+            host='openai',
+            retries=OPENAI_RETRIES,
+            retry_on=resilience.OPENAI_ERRORS,
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are an expert at creating targeted Instagram hashtags that maximize reach and engagement."},
@@ -116,7 +133,11 @@ def analyze_content_sentiment(post_title, caption):
             return {"sentiment": "neutral", "topics": ["general"], "engagement_prediction": "medium"}
     
     try:
-        completion = client.chat.completions.create(
+        completion = resilience.call_with_retry(
+            client.chat.completions.create,
+            host='openai',
+            retries=OPENAI_RETRIES,
+            retry_on=resilience.OPENAI_ERRORS,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "You are an expert social media content analyzer. Provide analysis in JSON format only."},
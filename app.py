@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context
 from flask_session import Session
 import praw
 import json
@@ -9,6 +9,10 @@ from instagrapi import Client
 from PIL import Image
 from datetime import datetime
 import ai_content_optimizer
+import caption_engine
+import media_eligibility
+import reddit_feed
+import resilience
 
 
 app = Flask(__name__)
@@ -65,6 +69,13 @@ def post_to_instagram():
         if not post_data:
             return jsonify({"status": "error", "message": "No post data received"}), 400
 
+        # Galleries and videos reach the dashboard but cannot be posted as a photo
+        if post_data.get('eligible') is False:
+            return jsonify({
+                "status": "error",
+                "message": f"Post cannot be uploaded to Instagram: {post_data.get('ineligible_reason') or 'not a single image'}"
+            }), 400
+
         # Load Instagram credentials from config
         try:
             with open('config.json', 'r') as f:
@@ -78,8 +89,8 @@ def post_to_instagram():
 
         # Create temp directory for media processing
         with tempfile.TemporaryDirectory() as temp_dir:
-            # Download and process the image
-            image_url = post_data.get('url')
+            # Download and process the image, preferring the size picked by the feed
+            image_url = post_data.get('download_url') or post_data.get('url')
             if not image_url:
                 return jsonify({
                     "status": "error",
@@ -88,7 +99,7 @@ def post_to_instagram():
 
             # Download image
             try:
-                response = requests.get(image_url)
+                response = resilience.resilient_get(image_url)
                 response.raise_for_status()
 
                 # Generate temporary file path
@@ -114,24 +125,58 @@ def post_to_instagram():
 
                 # Initialize Instagram client
                 instagram = Client()
-                instagram.login(
+                resilience.call_with_retry(
+                    instagram.login,
                     instagram_credentials['instagram_username'],
-                    instagram_credentials['instagram_password']
+                    instagram_credentials['instagram_password'],
+                    host='instagram',
+                    retry_on=resilience.INSTAGRAM_ERRORS,
+                    trip_on=resilience.INSTAGRAM_THROTTLE_ERRORS,
+                    trip_cooldown=resilience.INSTAGRAM_THROTTLE_COOLDOWN
                 )
 
                 # Get caption from post data or use default
                 caption = post_data.get('caption', post_data.get('title', ''))
 
-                # Upload to Instagram
-                instagram.photo_upload(
+                # Upload to Instagram. Never retried: a dropped connection may
+                # still have published the post, and a retry would duplicate it
+                resilience.call_with_retry(
+                    instagram.photo_upload,
                     path=temp_image_path,
-                    caption=caption
+                    caption=caption,
+                    host='instagram',
+                    retries=0,
+                    retry_on=resilience.INSTAGRAM_ERRORS,
+                    trip_on=resilience.INSTAGRAM_THROTTLE_ERRORS,
+                    trip_cooldown=resilience.INSTAGRAM_THROTTLE_COOLDOWN
                 )
 
-                return jsonify({
+                # Remember what has been published so the feed can exclude it
+                if post_data.get('id'):
+                    posted_ids = session.get('posted_ids', [])
+                    posted_ids.append(post_data['id'])
+                    session['posted_ids'] = posted_ids
+
+                result = {
                     "status": "success",
                     "message": "Successfully posted to Instagram"
-                })
+                }
+
+                # Teach the local hashtag index any tags the user or LLM added. The post
+                # is already published, so a failure here is only reported as a warning
+                try:
+                    caption_engine.record_post(post_data.get('subreddit'), post_data.get('title', ''), caption)
+                except Exception as e:
+                    app.logger.warning("Error recording hashtag history: %s", e)
+                    result["warning"] = f"Hashtag history not updated: {str(e)}"
+
+                return jsonify(result)
+
+            except resilience.CircuitOpenError as e:
+                return jsonify({
+                    "status": "error",
+                    "message": f"Service temporarily unavailable: {str(e)}"
+                }), 503
 
             except requests.exceptions.RequestException as e:
                 return jsonify({
@@ -192,14 +237,23 @@ def fetch_posts():
             }), 500
 
         posts = []
+        errors = []
         for subreddit_name in subreddits:
             try:
                 subreddit = reddit.subreddit(subreddit_name)
-                for post in subreddit.hot(limit=10):
-                    if post.url.endswith(('.jpg', '.jpeg', '.png')):
+                listing = resilience.call_with_retry(
+                    lambda: list(subreddit.hot(limit=10)),
+                    host='reddit',
+                    retries=resilience.REDDIT_RETRIES,
+                    retry_on=resilience.REDDIT_ERRORS
+                )
+                for post in listing:
+                    eligibility = media_eligibility.check_eligibility(post)
+                    if eligibility['eligible']:
                         posts.append({
                             'title': post.title,
                             'url': post.url,
+                            'download_url': eligibility['source']['url'],
                             'score': post.score,
                             'id': post.id,
                             'author': str(post.author),
@@ -207,13 +261,126 @@ def fetch_posts():
                             'permalink': f"https://reddit.com{post.permalink}"
                         })
             except Exception as e:
-                return jsonify({
-                    'error': f'Error fetching posts from r/{subreddit_name}: {str(e)}'
-                }), 500
+                # Keep the posts from the other subreddits instead of failing the whole request
+                errors.append(f'Error fetching posts from r/{subreddit_name}: {str(e)}')
+
+        if errors and not posts:
+            return jsonify({
+                'error': '; '.join(errors)
+            }), 502
+
+        return jsonify({
+            'status': 'success',
+            'posts': posts,
+            'errors': errors
+        })
+
+    except Exception as e:
+        return jsonify({
+            'error': f'Unexpected error: {str(e)}'
+        }), 500
+
+
+@app.route('/feed', methods=['POST'])
+def feed():
+    """
+    Paginated, filtered and ranked post feed
+
+    With "stream": true the response is NDJSON, one event per subreddit as soon
+    as it responds, followed by an "end" event carrying the next cursor.
+    """
+    try:
+        data = request.json or {}
+        subreddits = data.get('subreddits', [])
+
+        if not subreddits:
+            return jsonify({
+                'error': 'No subreddits selected'
+            }), 400
+
+        afters = reddit_feed.decode_cursor(data.get('cursor'))
+        if afters is None:
+            return jsonify({
+                'error': 'Invalid cursor'
+            }), 400
+
+        media_type = data.get('media_type', 'image')
+        ranking = data.get('ranking', 'hot')
+        if media_type not in reddit_feed.MEDIA_TYPES or ranking not in reddit_feed.RANKINGS:
+            return jsonify({
+                'error': 'Invalid media_type or ranking'
+            }), 400
+
+        try:
+            limit = max(1, min(int(data.get('limit', 10)), reddit_feed.MAX_PAGE_SIZE))
+            min_score = data.get('min_score')
+            min_score = int(min_score) if min_score not in (None, '') else None
+            max_age_hours = data.get('max_age_hours')
+            max_age_hours = float(max_age_hours) if max_age_hours not in (None, '') else None
+        except (TypeError, ValueError):
+            return jsonify({
+                'error': 'limit, min_score and max_age_hours must be numbers'
+            }), 400
+
+        filters = {
+            'media_type': media_type,
+            'min_score': min_score,
+            'max_age_hours': max_age_hours,
+            'exclude_posted': data.get('exclude_posted', True)
+        }
+
+        # Load configuration
+        try:
+            with open('config.json', 'r') as f:
+                config = json.load(f)
+                reddit_credentials = config['reddit_credentials']
+        except (FileNotFoundError, KeyError):
+            return jsonify({
+                'error': 'Configuration not found. Please set up credentials first.'
+            }), 400
+
+        def make_reddit():
+            return praw.Reddit(
+                client_id=reddit_credentials['reddit_client_id'],
+                client_secret=reddit_credentials['reddit_client_secret'],
+                user_agent=reddit_credentials['reddit_username']
+            )
+
+        events = reddit_feed.stream_feed(
+            make_reddit,
+            subreddits,
+            afters,
+            limit,
+            filters,
+            posted_ids=set(session.get('posted_ids', [])),
+            ranking=ranking
+        )
+
+        if data.get('stream', False):
+            def generate():
+                for event in events:
+                    yield json.dumps(event) + '\n'
+
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+        # Events arrive in completion order; merge by the requested subreddit
+        # order so the same page always comes back in the same order
+        pages = {}
+        errors = []
+        cursor = None
+        for event in events:
+            if event['type'] == 'posts':
+                pages[event['subreddit']] = event['posts']
+            elif event['type'] == 'error':
+                errors.append(event['message'])
+            else:
+                cursor = event['cursor']
 
         return jsonify({
             'status': 'success',
-            'posts': posts
+            'posts': reddit_feed.merge_pages(pages, subreddits, ranking),
+            'cursor': cursor,
+            'errors': errors
         })
 
     except Exception as e:
@@ -243,21 +410,26 @@ def optimize_content():
         subreddit = data.get('subreddit', '')
         optimization_level = data.get('optimization_level', 'moderate')
         
-        # Optimize caption
-        optimized_caption = ai_content_optimizer.optimize_caption(
-            original_caption, 
-            subreddit, 
-            post_title, 
-            optimization_level
+        # Optimize caption, using the local template when its hashtags are
+        # confident and only asking the LLM otherwise
+        optimized_caption, caption_source = caption_engine.caption_with_fallback(
+            subreddit,
+            post_title,
+            original_caption,
+            optimization_level,
+            llm=ai_content_optimizer.optimize_caption
         )
         
-        # Generate hashtags separately if requested
+        # Generate hashtags separately if requested, only asking the LLM
+        # when the local index is not confident enough
         hashtags = None
+        hashtag_source = None
         if data.get('generate_hashtags', False):
-            hashtags = ai_content_optimizer.generate_hashtags(
+            hashtags, hashtag_source = caption_engine.hashtags_with_fallback(
                 subreddit,
                 post_title,
-                optimized_caption[:100]  # Just use the beginning of the caption
+                optimized_caption[:100],  # Just use the beginning of the caption
+                llm=ai_content_optimizer.generate_hashtags
             )
             
         # Get content analysis if requested
@@ -271,7 +443,10 @@ def optimize_content():
         return jsonify({
             "status": "success",
             "optimized_caption": optimized_caption,
+            "caption_source": caption_source,
             "hashtags": hashtags,
+            "hashtag_source": hashtag_source,
+            "engine_stats": caption_engine.get_stats(),
             "analysis": analysis
         })
         
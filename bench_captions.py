@@ -0,0 +1,181 @@
+"""
+Benchmark the local caption engine against the LLM caption flow.
+
+The old flow calls optimize_caption and generate_hashtags for every post. The
+new flow mirrors /optimize-content: it uses the local template caption and
+hashtags when the local index is confident and only calls the LLM otherwise. Both go through the
+real ai_content_optimizer code and OpenAI SDK, pointed at a local stub of the
+chat completions endpoint that answers after a configurable delay.
+
+Usage:
+    python bench_captions.py [--caption-delay 1.5] [--hashtag-delay 0.6]
+                             [--history hashtag_history.json] [--listings hot.json ...]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from openai import OpenAI
+
+import ai_content_optimizer
+import caption_engine
+import media_eligibility
+
+# Sample titles written in the style of each subreddit's front page. Pass
+# --listings with recorded hot.json files to benchmark real titles instead.
+SAMPLE_TITLES = [
+    ('MMA', 'Jon Jones vs Stipe Miocic full fight highlights'),
+    ('MMA', 'Khabib explains why he will never come back to fighting'),
+    ('MMA', 'Islam Makhachev defends the lightweight title with a fourth round submission'),
+    ('MMA', 'Brutal head kick KO from last night'),
+    ('MMA', 'Official weigh-in results for UFC 310'),
+    ('MMA', 'Poatan throws hands in training camp footage'),
+    ('MMA', 'Dana White confirms the date for the next White House card'),
+    ('MMA', 'BJJ black belt taps a wrestler in under a minute'),
+    ('MMA', 'What is the most underrated fight of the decade?'),
+    ('MMA', 'Muay Thai clinch work from Jiri Prochazka'),
+    ('ufc', 'Full fight card announced for UFC 300'),
+    ('ufc', 'Alex Pereira knockout compilation'),
+    ('ufc', 'Topuria becomes champion with a right hand KO'),
+    ('ufc', 'Sean O\'Malley wrestling looked improved this camp'),
+    ('ufc', 'Merab Dvalishvili breaks the takedown record'),
+    ('ufc', 'Press conference faceoff gets heated'),
+    ('ufc', 'Belal finally gets his title shot'),
+    ('ufc', 'Kickboxing legend signs with the UFC'),
+    ('ufc', 'Champion vs champion super fight rumours'),
+    ('ufc', 'Embedded episode 3 is out'),
+    ('mmamemes', 'When the ref stops it too early'),
+    ('mmamemes', 'Me after one BJJ class explaining chokes to my family'),
+    ('mmamemes', 'Nobody: Absolutely nobody: Chael Sonnen'),
+    ('mmamemes', 'POV you just got knocked out by Poatan'),
+    ('mmamemes', 'The ufc matchmaking department every week'),
+    ('mmamemes', 'Boxing fans trying to understand wrestling'),
+    ('mmamemes', 'Him: I could take a punch. The punch:'),
+    ('mmamemes', 'When your coach says just one more round'),
+    ('mmamemes', 'Championship belt collection starter pack'),
+    ('mmamemes', 'Every Conor tweet be like'),
+]
+
+
+class StubCompletions(BaseHTTPRequestHandler):
+    """Minimal /v1/chat/completions endpoint that answers after a model-specific delay"""
+
+    delays = {}
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        model = body.get('model', '')
+        time.sleep(self.delays.get(model, 0))
+        content = "#mma #ufc #fight #knockout #fyp" if model == 'gpt-3.5-turbo' else "Optimized caption 🔥 #mma"
+        payload = json.dumps({
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def old_flow(subreddit, title):
+    caption = f"{title} 🔥🔥🔥"
+    optimized = ai_content_optimizer.optimize_caption(caption, subreddit, title)
+    ai_content_optimizer.generate_hashtags(subreddit, title, optimized[:100])
+    return 2
+
+
+def new_flow(subreddit, title):
+    caption, caption_source = caption_engine.caption_with_fallback(
+        subreddit, title, f"{title} 🔥🔥🔥", llm=ai_content_optimizer.optimize_caption
+    )
+    _, hashtag_source = caption_engine.hashtags_with_fallback(
+        subreddit, title, caption[:100], llm=ai_content_optimizer.generate_hashtags
+    )
+    return (caption_source == 'llm') + (hashtag_source == 'llm')
+
+
+def run(flow, samples):
+    latencies = []
+    llm_calls = 0
+    for subreddit, title in samples:
+        started = time.perf_counter()
+        llm_calls += flow(subreddit, title)
+        latencies.append(time.perf_counter() - started)
+    return latencies, llm_calls
+
+
+def describe(name, latencies, llm_calls):
+    ms = sorted(latency * 1000 for latency in latencies)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(f"{name:<10} LLM calls: {llm_calls:>3}   mean {statistics.mean(ms):9.3f} ms   "
+          f"median {statistics.median(ms):9.3f} ms   p95 {p95:9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--caption-delay', type=float, default=1.5,
+                        help="Seconds the stub takes to answer optimize_caption (gpt-4o-mini)")
+    parser.add_argument('--hashtag-delay', type=float, default=0.6,
+                        help="Seconds the stub takes to answer generate_hashtags (gpt-3.5-turbo)")
+    parser.add_argument('--history', help="Hashtag history file to warm the local index with")
+    parser.add_argument('--listings', nargs='*', default=[], help="Recorded hot.json files to take titles from")
+    args = parser.parse_args()
+
+    samples = SAMPLE_TITLES
+    if args.listings:
+        samples = [
+            (post['subreddit'], post['title'])
+            for path in args.listings for post in media_eligibility.load_listing(path)
+        ]
+
+    StubCompletions.delays = {'gpt-4o-mini': args.caption_delay, 'gpt-3.5-turbo': args.hashtag_delay}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubCompletions)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ai_content_optimizer.client = OpenAI(
+        api_key='stub',
+        base_url=f'http://127.0.0.1:{server.server_port}/v1',
+        max_retries=0,
+        timeout=ai_content_optimizer.REQUEST_TIMEOUT
+    )
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        caption_engine.HISTORY_FILE = args.history or os.path.join(temp_dir, 'hashtag_history.json')
+        caption_engine.initialize()
+
+        print(f"Posts: {len(samples)}  (stub delays: caption {args.caption_delay}s, hashtags {args.hashtag_delay}s)")
+        old_latencies, old_calls = run(old_flow, samples)
+        new_latencies, new_calls = run(new_flow, samples)
+        local_only = [latency for latency, sample in zip(new_latencies, samples)
+                      if caption_engine.select_hashtags(*sample)[1] >= caption_engine.CONFIDENCE_THRESHOLD]
+
+    server.shutdown()
+    server.server_close()
+
+    describe('old flow', old_latencies, old_calls)
+    describe('new flow', new_latencies, new_calls)
+    if local_only:
+        describe('local only', local_only, 0)
+    print(f"LLM calls avoided: {old_calls - new_calls} of {old_calls} "
+          f"({(old_calls - new_calls) / old_calls:.0%}); "
+          f"posts handled without any LLM call: {len(local_only)} of {len(samples)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+import json
+import re
+import threading
+from collections import Counter, defaultdict
+from string import Template
+
+CONFIG_FILE = "config.json"
+HISTORY_FILE = "hashtag_history.json"
+
+# Below this confidence callers should fall back to the LLM
+CONFIDENCE_THRESHOLD = 0.5
+
+# Confidence contributed by having a curated hashtag set for the subreddit.
+# Kept below the threshold so the title itself has to match the index.
+SEED_CONFIDENCE = 0.2
+
+DEFAULT_TEMPLATE = "${title} 🔥🔥🔥\n\n${hashtags}"
+
+MMA_HASHTAGS = [
+    "#mma", "#ufc", "#viral", "#fyp", "#mixedmartialarts", "#mmafıghter", "#mmanews",
+    "#ufcnews", "#mmacommunity", "#ufcfıghter", "#champion", "#mmafıghters", "#wrestling",
+    "#kickboxing", "#boxing", "#combatsports", "#bjj", "#mmastriking", "#submission",
+    "#mmatraining", "#ko", "#muaythai", "#jiujitsu",
+]
+
+DEFAULT_HASHTAGS = ["#viral", "#trending", "#reddit", "#fyp"]
+
+# Hashtag sets and caption templates keyed by lowercase subreddit name
+SUBREDDIT_HASHTAGS = {
+    'mma': MMA_HASHTAGS,
+    'ufc': MMA_HASHTAGS,
+    'mmamemes': ["#mmamemes", "#memes"] + MMA_HASHTAGS,
+}
+
+SUBREDDIT_TEMPLATES = {
+    'mma': "${title} 🔥🔥🔥\n\n📸 via r/MMA\n\n${hashtags}",
+    'ufc': "${title} 🥊🔥\n\n📸 via r/ufc\n\n${hashtags}",
+    'mmamemes': "${title} 😂😂😂\n\nTag someone who needs to see this 👇\n\n📸 via r/mmamemes\n\n${hashtags}",
+}
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'from', 'has', 'have',
+    'he', 'his', 'i', 'in', 'is', 'it', 'its', 'just', 'me', 'my', 'of', 'on', 'or', 'so',
+    'that', 'the', 'this', 'to', 'was', 'we', 'what', 'when', 'who', 'with', 'you', 'your',
+}
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+HASHTAG_PATTERN = re.compile(r"#\w+")
+
+# How often the local engine was good enough versus needing the LLM, since startup
+stats = {'local': 0, 'llm': 0}
+_stats_lock = threading.Lock()
+
+
+def extract_keywords(text):
+    """Lowercase words from text without stopwords or single characters"""
+    return [w for w in WORD_PATTERN.findall(text.lower()) if len(w) > 1 and w not in STOPWORDS]
+
+
+class HashtagIndex:
+    """
+    Local hashtag ranking index.
+
+    Maps title keywords to the hashtags that were used alongside them, and
+    knows each subreddit's curated seed hashtag set plus the tags learned
+    from its post history. Ranking is a handful of dict lookups, so it runs
+    in microseconds.
+    """
+
+    def __init__(self, subreddit_hashtags=None):
+        self.subreddit_hashtags = {
+            name.lower(): list(dict.fromkeys(tags))
+            for name, tags in (subreddit_hashtags or {}).items()
+        }
+        self.keyword_tags = defaultdict(Counter)
+        self.learned_tags = defaultdict(Counter)
+        self.vocabulary = set()
+        for tags in self.subreddit_hashtags.values():
+            self.vocabulary.update(tag[1:].lower() for tag in tags)
+        self._lock = threading.Lock()
+
+    def add(self, subreddit, title, hashtags):
+        """Learn from a published post's title and hashtags"""
+        tags = [tag.lower() for tag in hashtags]
+        with self._lock:
+            for keyword in set(extract_keywords(title)):
+                self.keyword_tags[keyword].update(tags)
+            self.vocabulary.update(tag[1:] for tag in tags)
+            if subreddit:
+                self.learned_tags[subreddit.lower()].update(tags)
+
+    def rank(self, subreddit, title, count=10):
+        """
+        Rank hashtags for a post
+
+        Returns:
+            Tuple of (list of hashtags, confidence between 0 and 1)
+        """
+        scores = Counter()
+        subreddit = (subreddit or '').lower()
+        seed_tags = self.subreddit_hashtags.get(subreddit, [])
+        for position, tag in enumerate(seed_tags):
+            # Keep the curated order of the seed set as a tie breaker
+            scores[tag] += 1 + 1 / (position + 2)
+
+        keywords = extract_keywords(title)
+        matched = 0
+        # add() mutates the counters from request threads while the feed ranks
+        # from its worker pool, so read them under the same lock
+        with self._lock:
+            learned = self.learned_tags.get(subreddit)
+            if learned:
+                total = sum(learned.values())
+                for tag, used in learned.most_common(count):
+                    scores[tag] += used / total
+
+            for keyword in keywords:
+                hit = False
+                if keyword in self.vocabulary:
+                    scores['#' + keyword] += 3
+                    hit = True
+                related = self.keyword_tags.get(keyword)
+                if related:
+                    total = sum(related.values())
+                    for tag, used in related.most_common(count):
+                        scores[tag] += 2 * used / total
+                    hit = True
+                matched += hit
+
+        # Confidence comes mostly from how much of the title the index knows;
+        # a seed set alone never reaches CONFIDENCE_THRESHOLD
+        coverage = matched / len(keywords) if keywords else 0
+        confidence = SEED_CONFIDENCE * bool(seed_tags) + (1 - SEED_CONFIDENCE) * coverage
+        if not scores:
+            return [], 0.0
+        return [tag for tag, _ in scores.most_common(count)], round(confidence, 3)
+
+
+_templates = None
+_index = None
+_init_lock = threading.Lock()
+
+
+def _read_caption_config():
+    try:
+        with open(CONFIG_FILE, 'r') as f:
+            return json.load(f).get('captions', {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _read_history():
+    try:
+        with open(HISTORY_FILE, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+
+def initialize():
+    """
+    Compile caption templates and build the hashtag index
+
+    Templates and hashtag sets can be overridden per subreddit in config.json:
+    {"captions": {"templates": {"ufc": "..."}, "hashtags": {"ufc": ["#ufc"]}}}
+    """
+    global _templates, _index
+
+    captions_config = _read_caption_config()
+
+    templates = {name.lower(): text for name, text in SUBREDDIT_TEMPLATES.items()}
+    templates.update({name.lower(): text for name, text in captions_config.get('templates', {}).items()})
+    compiled = {name: Template(text) for name, text in templates.items()}
+    compiled[''] = Template(captions_config.get('default_template', DEFAULT_TEMPLATE))
+
+    hashtags = dict(SUBREDDIT_HASHTAGS)
+    hashtags.update(captions_config.get('hashtags', {}))
+    index = HashtagIndex(hashtags)
+    for entry in _read_history():
+        index.add(entry.get('subreddit'), entry.get('title', ''), entry.get('hashtags', []))
+
+    _templates, _index = compiled, index
+
+
+def _ensure_initialized():
+    if _index is None:
+        with _init_lock:
+            if _index is None:
+                initialize()
+
+
+def select_hashtags(subreddit, title, count=10):
+    """
+    Pick hashtags for a post from the local index
+
+    Returns:
+        Tuple of (hashtag string, confidence between 0 and 1)
+    """
+    _ensure_initialized()
+    tags, confidence = _index.rank(subreddit, title, count)
+    if not tags:
+        tags = DEFAULT_HASHTAGS
+    return " ".join(tags), confidence
+
+
+def build_caption(subreddit, title, count=30):
+    """
+    Render the subreddit's caption template with locally selected hashtags
+
+    Returns:
+        Tuple of (caption string, hashtag confidence)
+    """
+    _ensure_initialized()
+    hashtags, confidence = select_hashtags(subreddit, title, count)
+    template = _templates.get((subreddit or '').lower(), _templates[''])
+    caption = template.safe_substitute(title=title, subreddit=subreddit, hashtags=hashtags)
+    return caption, confidence
+
+
+def _count(source):
+    with _stats_lock:
+        stats[source] += 1
+
+
+def get_stats():
+    """
+    Count the caption and hashtag requests answered locally versus by the LLM
+
+    Returns:
+        Dictionary with local, llm and llm_calls_avoided counts since startup
+    """
+    with _stats_lock:
+        return {**stats, 'llm_calls_avoided': stats['local']}
+
+
+def caption_with_fallback(subreddit, title, caption, optimization_level='moderate', llm=None):
+    """
+    Use the local template caption when its hashtags are confident, otherwise ask the LLM
+
+    Args:
+        llm: Callable with the signature of ai_content_optimizer.optimize_caption
+
+    Returns:
+        Tuple of (caption string, 'local' or 'llm')
+    """
+    local_caption, confidence = build_caption(subreddit, title)
+    if confidence >= CONFIDENCE_THRESHOLD or llm is None:
+        _count('local')
+        return local_caption, 'local'
+    _count('llm')
+    return llm(caption, subreddit, title, optimization_level), 'llm'
+
+
+def hashtags_with_fallback(subreddit, title, caption, count=10, llm=None):
+    """
+    Use local hashtags when confident, otherwise ask the LLM
+
+    Args:
+        llm: Callable with the signature of ai_content_optimizer.generate_hashtags
+
+    Returns:
+        Tuple of (hashtag string, 'local' or 'llm')
+    """
+    hashtags, confidence = select_hashtags(subreddit, title, count)
+    if confidence >= CONFIDENCE_THRESHOLD or llm is None:
+        _count('local')
+        return hashtags, 'local'
+    _count('llm')
+    return llm(subreddit, title, caption, count), 'llm'
+
+
+def record_post(subreddit, title, caption):
+    """
+    Learn from a published post's hashtags
+
+    Only tags the local engine would not have picked itself are learned, i.e.
+    ones a user typed or the LLM suggested. Learning the engine's own output
+    would feed back into the index and inflate its confidence.
+
+    Returns:
+        True if anything was recorded
+    """
+    _ensure_initialized()
+    own_tags, _ = select_hashtags(subreddit, title, count=len(HASHTAG_PATTERN.findall(caption or '')) or 1)
+    own_tags = set(own_tags.lower().split())
+    hashtags = [tag for tag in HASHTAG_PATTERN.findall(caption or '') if tag.lower() not in own_tags]
+    if not hashtags:
+        return False
+
+    _index.add(subreddit, title, hashtags)
+
+    with _init_lock:
+        history = _read_history()
+        history.append({'subreddit': subreddit, 'title': title, 'hashtags': hashtags})
+        with open(HISTORY_FILE, 'w') as f:
+            json.dump(history, f, indent=4)
+    return True
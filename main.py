@@ -6,6 +6,9 @@ from datetime import datetime
 from instagrapi import Client
 import time
 import json
+import caption_engine
+import media_eligibility
+import resilience
 
 CONFIG_FILE = "config.json"
 
@@ -124,7 +127,12 @@ def setup_instagram_client(instagram_credentials):
     password = instagram_credentials["instagram_password"]
     try:
         client = Client()
-        client.login(username, password)
+        resilience.call_with_retry(
+            client.login, username, password,
+            host='instagram', retry_on=resilience.INSTAGRAM_ERRORS,
+            trip_on=resilience.INSTAGRAM_THROTTLE_ERRORS,
+            trip_cooldown=resilience.INSTAGRAM_THROTTLE_COOLDOWN
+        )
         print("\nSuccessfully logged into Instagram!")
         return client
     except Exception as e:
@@ -159,9 +167,14 @@ def setup_reddit_client(reddit_credentials):
 def download_media(url, filename):
     """
     Downloads media from a URL and saves it with the given filename.
-    Returns the path to the saved file.
+    Transient CDN failures are retried with backoff.
+    Returns the path to the saved file, or None if the download failed.
     """
-    response = requests.get(url)
+    try:
+        response = resilience.resilient_get(url)
+    except (requests.exceptions.RequestException, resilience.CircuitOpenError) as e:
+        print(f"Error downloading {url}: {e}")
+        return None
     if response.status_code == 200:
         with open(filename, 'wb') as f:
             f.write(response.content)
@@ -189,26 +202,40 @@ def scrape_subreddit_posts(reddit, subreddit_name, limit=10, post_type="all"):
     """
     Scrapes posts from a specified subreddit.
     post_type can be "all", "image", or "video"
+
+    Image posts are checked against Instagram's limits using listing metadata
+    only, so unusable posts are dropped before any media is downloaded.
     """
     subreddit = reddit.subreddit(subreddit_name)
     posts_data = []
 
-    for post in subreddit.hot(limit=limit):
+    listing = resilience.call_with_retry(
+        lambda: list(subreddit.hot(limit=limit)),
+        host='reddit', retries=resilience.REDDIT_RETRIES,
+        retry_on=resilience.REDDIT_ERRORS
+    )
+
+    for post in listing:
+        eligibility = media_eligibility.check_eligibility(post)
+
         # Skip posts that don't have media if we're looking for specific types
-        if post_type == "image" and not post.url.endswith(('.jpg', '.jpeg', '.png')):
+        if post_type == "image" and not eligibility['eligible']:
             continue
-        if post_type == "video" and not hasattr(post, 'is_video'):
+        if post_type == "video" and eligibility['media_type'] != "video":
             continue
 
+        source = eligibility['source']
         post_data = {
             'title': post.title,
             'url': post.url,
+            'download_url': source['url'] if source else post.url,
+            'subreddit': subreddit_name,
             'score': post.score,
             'id': post.id,
             'author': str(post.author),
             'created_utc': datetime.fromtimestamp(post.created_utc),
             'permalink': f"https://reddit.com{post.permalink}",
-            'is_video': hasattr(post, 'is_video') and post.is_video
+            'is_video': eligibility['media_type'] == "video"
         }
         posts_data.append(post_data)
 
@@ -226,12 +253,10 @@ def prepare_instagram_post(post_data):
 
     # Download the media
     filename = f"media/{post_data['id']}.jpg"
-    media_path = download_media(post_data['url'], filename)
-
-    # Prepare the caption
-    caption = f"""{post_data['title']} 🔥🔥🔥
+    media_path = download_media(post_data.get('download_url') or post_data['url'], filename)
 
-#mma #ufc #viral #fyp #mixedmartialarts #mmafıghter #mmanews #ufcnews #mmacommunity #ufcfıghter #champion #mmafıghters #wrestling #kickboxing #boxing #combatsports #mixedmartialarts #bjj #mmastriking #submission #mmatraining #ko #muaythai #jiujitsu"""
+    # Prepare the caption from the subreddit's template and local hashtag index
+    caption, _ = caption_engine.build_caption(post_data.get('subreddit'), post_data['title'])
 
     return media_path, caption
 
@@ -239,10 +264,18 @@ def prepare_instagram_post(post_data):
 def post_to_instagram(client, media_path, caption):
     """
     Posts the prepared content to Instagram using instagrapi.
+    The upload is never retried, since a dropped connection may still have
+    published the post; failures and throttling feed the Instagram circuit breaker.
     Returns True if successful, False otherwise.
     """
     try:
-        client.photo_upload(media_path, caption)
+        resilience.call_with_retry(
+            client.photo_upload, media_path, caption,
+            host='instagram', retries=0,
+            retry_on=resilience.INSTAGRAM_ERRORS,
+            trip_on=resilience.INSTAGRAM_THROTTLE_ERRORS,
+            trip_cooldown=resilience.INSTAGRAM_THROTTLE_COOLDOWN
+        )
         time.sleep(30)  # Cooldown period after posting
         return True
     except Exception as e:
@@ -276,7 +309,11 @@ def main():
     # Collect posts from all subreddits
     for subreddit in subreddits:
         print(f"\nScraping posts from r/{subreddit}...")
-        subreddit_posts = scrape_subreddit_posts(reddit, subreddit, limit=20, post_type="image")
+        try:
+            subreddit_posts = scrape_subreddit_posts(reddit, subreddit, limit=20, post_type="image")
+        except Exception as e:
+            print(f"Error scraping r/{subreddit}, skipping: {e}")
+            continue
         posts_queue.extend(subreddit_posts.to_dict('records'))
 
     if not posts_queue:
@@ -0,0 +1,320 @@
+"""
+Decide which Reddit posts can be posted to Instagram from listing metadata alone.
+
+Run as a script to compare this filter with the old URL-suffix filter over
+saved listings:
+
+    python media_eligibility.py --record MMA mma_hot.json
+    python media_eligibility.py --measure mma_hot.json
+
+The listings under tests/fixtures/listings/ are synthetic, hand-made posts,
+and byte totals without --measure are pixel-count estimates. Numbers from
+them are illustrative only. Real figures come from recording live listings
+with --record and measuring them with --measure.
+"""
+import argparse
+import html
+import json
+import sys
+from urllib.parse import urlparse
+
+import requests
+
+import resilience
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png')
+
+# Instagram feed photo limits
+DEFAULT_RULES = {
+    'min_width': 320,           # Instagram upscales anything narrower and it looks bad
+    'target_width': 1080,       # Instagram never displays more than this
+    'min_aspect_ratio': 0.8,    # 4:5 portrait
+    'max_aspect_ratio': 1.91,   # 1.91:1 landscape
+    'allow_nsfw': False,
+    'allow_galleries': False,
+}
+
+# Rough JPEG size per pixel, only used to estimate bytes in corpus reports
+ESTIMATED_BYTES_PER_PIXEL = 0.3
+
+# Rejections for posts Instagram itself would have refused after the download
+UPLOAD_REJECTION_REASONS = ('too_small', 'aspect_ratio')
+
+
+def get_field(post, name, default=None):
+    """
+    Read a field from either a praw submission or a raw listing dict
+
+    Submissions are read through their instance dict rather than getattr:
+    praw fetches the whole submission from Reddit when a missing attribute is
+    accessed, and most listing posts have no is_gallery or media_metadata.
+    """
+    if isinstance(post, dict):
+        return post.get(name, default)
+    return vars(post).get(name, default)
+
+
+def get_media_type(post):
+    """Classify a submission as 'image', 'gallery', 'video' or 'other' from listing metadata"""
+    if get_field(post, 'is_gallery') or get_field(post, 'media_metadata'):
+        return 'gallery'
+    if get_field(post, 'is_video') is True or get_field(post, 'post_hint') in ('hosted:video', 'rich:video'):
+        return 'video'
+    url = (get_field(post, 'url') or '').lower()
+    if get_field(post, 'post_hint') == 'image' or url.endswith(IMAGE_SUFFIXES):
+        return 'image'
+    return 'other'
+
+
+def get_renditions(post):
+    """
+    List the available sizes of a post's image, smallest first
+
+    Returns:
+        List of {'url', 'width', 'height'} dictionaries. The last entry is the
+        original upload when the listing includes it.
+    """
+    renditions = []
+    preview = get_field(post, 'preview') or {}
+    images = preview.get('images') or []
+    if images:
+        sizes = list(images[0].get('resolutions') or [])
+        if images[0].get('source'):
+            sizes.append(images[0]['source'])
+        renditions = [
+            {'url': html.unescape(r['url']), 'width': r['width'], 'height': r['height']}
+            for r in sizes if r.get('url')
+        ]
+    else:
+        # Galleries describe their images in media_metadata instead of preview
+        for item in (get_field(post, 'media_metadata') or {}).values():
+            if item.get('status') != 'valid':
+                continue
+            sizes = list(item.get('p') or [])
+            if item.get('s'):
+                sizes.append(item['s'])
+            renditions = [
+                {'url': html.unescape(r['u']), 'width': r['x'], 'height': r['y']}
+                for r in sizes if r.get('u')
+            ]
+            break
+    return sorted(renditions, key=lambda r: r['width'])
+
+
+def pick_source(post, renditions, target_width):
+    """
+    Choose the smallest rendition that still fills an Instagram post
+
+    The original URL is used when it is already no wider than the target,
+    since it is then the best quality available at no extra cost.
+    """
+    original = renditions[-1]
+    url = get_field(post, 'url') or ''
+    if original['width'] <= target_width and url.lower().endswith(IMAGE_SUFFIXES):
+        return {'url': url, 'width': original['width'], 'height': original['height']}
+    for rendition in renditions:
+        if rendition['width'] >= target_width:
+            return rendition
+    return original
+
+
+def _is_removed(post):
+    if get_field(post, 'removed_by_category'):
+        return True
+    author = get_field(post, 'author')
+    if author is None or str(author) == '[deleted]':
+        return True
+    return get_field(post, 'selftext') in ('[removed]', '[deleted]')
+
+
+def check_eligibility(post, rules=None):
+    """
+    Decide whether a post can go to Instagram using only its listing metadata
+
+    Args:
+        post: praw submission or raw listing dict
+        rules: Overrides for DEFAULT_RULES
+
+    Returns:
+        Dictionary with eligible (bool), reason (str or None), media_type and
+        source ({'url', 'width', 'height'} to download, or None)
+    """
+    rules = {**DEFAULT_RULES, **(rules or {})}
+    media_type = get_media_type(post)
+    result = {'eligible': False, 'reason': None, 'media_type': media_type, 'source': None}
+
+    if _is_removed(post):
+        result['reason'] = 'removed'
+    elif get_field(post, 'over_18') and not rules['allow_nsfw']:
+        result['reason'] = 'nsfw'
+    elif media_type == 'gallery' and not rules['allow_galleries']:
+        result['reason'] = 'gallery'
+    elif media_type not in ('image', 'gallery'):
+        result['reason'] = 'not_image'
+    else:
+        renditions = get_renditions(post)
+        if not renditions:
+            result['reason'] = 'no_preview'
+            return result
+
+        original = renditions[-1]
+        aspect_ratio = original['width'] / original['height'] if original['height'] else 0
+        if original['width'] < rules['min_width']:
+            result['reason'] = 'too_small'
+        elif not rules['min_aspect_ratio'] <= aspect_ratio <= rules['max_aspect_ratio']:
+            result['reason'] = 'aspect_ratio'
+        else:
+            result['eligible'] = True
+            result['source'] = pick_source(post, renditions, rules['target_width'])
+
+    return result
+
+
+def content_length(url):
+    """
+    Measure a download's size with a HEAD request
+
+    Returns:
+        Size in bytes, or None when the server does not report one
+    """
+    try:
+        response = resilience.call_with_retry(
+            requests.head, url,
+            host=urlparse(url).netloc or url,
+            allow_redirects=True,
+            timeout=resilience.DEFAULT_TIMEOUT
+        )
+    except (requests.exceptions.RequestException, resilience.CircuitOpenError):
+        return None
+    length = response.headers.get('Content-Length')
+    return int(length) if response.ok and length and length.isdigit() else None
+
+
+def _estimate_bytes(rendition):
+    return int(rendition['width'] * rendition['height'] * ESTIMATED_BYTES_PER_PIXEL)
+
+
+def summarize_corpus(posts, rules=None, measure=None):
+    """
+    Compare the old URL-suffix filter against the eligibility engine over recorded posts
+
+    The suffix filter downloads every .jpg/.jpeg/.png original. Of those, the
+    ones the engine rejects for size or aspect ratio are uploads Instagram
+    would have refused. NSFW, removed and preview-less posts are counted as
+    other_downloads_avoided, since Instagram would have accepted them.
+
+    Byte totals are estimates from pixel counts unless `measure` is given,
+    in which case it is called with each download URL (e.g. content_length)
+    and the reported sizes are summed as well.
+
+    Returns:
+        Dictionary of counts and byte totals for both approaches
+    """
+    report = {
+        'posts': 0,
+        'suffix_downloads': 0,
+        'eligible_downloads': 0,
+        'rejected': {},
+        'rejected_uploads_avoided': 0,
+        'other_downloads_avoided': 0,
+        'estimated_suffix_bytes': 0,
+        'estimated_eligible_bytes': 0,
+        'unestimated_downloads': 0,
+    }
+    if measure:
+        report.update({'measured_suffix_bytes': 0, 'measured_eligible_bytes': 0, 'unmeasured_downloads': 0})
+
+    def add_measured(key, url):
+        size = measure(url)
+        if size is None:
+            report['unmeasured_downloads'] += 1
+        else:
+            report[key] += size
+
+    for post in posts:
+        report['posts'] += 1
+        result = check_eligibility(post, rules)
+        url = get_field(post, 'url') or ''
+
+        if url.lower().endswith(IMAGE_SUFFIXES):
+            report['suffix_downloads'] += 1
+            renditions = get_renditions(post)
+            if renditions:
+                report['estimated_suffix_bytes'] += _estimate_bytes(renditions[-1])
+            else:
+                report['unestimated_downloads'] += 1
+            if measure:
+                add_measured('measured_suffix_bytes', url)
+
+            if result['reason'] in UPLOAD_REJECTION_REASONS:
+                report['rejected_uploads_avoided'] += 1
+            elif not result['eligible']:
+                report['other_downloads_avoided'] += 1
+
+        if result['eligible']:
+            report['eligible_downloads'] += 1
+            report['estimated_eligible_bytes'] += _estimate_bytes(result['source'])
+            if measure:
+                add_measured('measured_eligible_bytes', result['source']['url'])
+        else:
+            report['rejected'][result['reason']] = report['rejected'].get(result['reason'], 0) + 1
+
+    return report
+
+
+def load_listing(path):
+    """Load the posts from a saved Reddit listing JSON file (e.g. /r/<sub>/hot.json)"""
+    with open(path, 'r') as f:
+        listing = json.load(f)
+    return [child['data'] for child in listing['data']['children'] if child.get('kind') == 't3']
+
+
+def record_listing(subreddit, path, limit=100, user_agent='media-eligibility-corpus/1.0'):
+    """Save a subreddit's current hot listing as JSON for use as a corpus"""
+    response = resilience.resilient_get(
+        f"https://www.reddit.com/r/{subreddit}/hot.json",
+        params={'limit': limit, 'raw_json': 1},
+        headers={'User-Agent': user_agent}
+    )
+    response.raise_for_status()
+    with open(path, 'w') as f:
+        json.dump(response.json(), f, indent=1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure media eligibility over saved Reddit listings")
+    parser.add_argument('listings', nargs='*', help="Saved listing JSON files")
+    parser.add_argument('--record', nargs=2, metavar=('SUBREDDIT', 'PATH'),
+                        help="Save r/SUBREDDIT's hot listing to PATH and exit")
+    parser.add_argument('--measure', action='store_true',
+                        help="Also measure download sizes with HEAD requests")
+    args = parser.parse_args()
+
+    if args.record:
+        record_listing(*args.record)
+        print(f"Saved r/{args.record[0]} to {args.record[1]}")
+        sys.exit(0)
+    if not args.listings:
+        parser.print_usage()
+        sys.exit(1)
+
+    corpus = []
+    synthetic = []
+    for listing_path in args.listings:
+        corpus.extend(load_listing(listing_path))
+        with open(listing_path, 'r') as f:
+            if json.load(f).get('_note'):
+                synthetic.append(listing_path)
+
+    if synthetic:
+        print(f"ILLUSTRATIVE ONLY: {', '.join(synthetic)} are synthetic listings. "
+              f"Record real ones with --record and measure them with --measure.", file=sys.stderr)
+
+    summary = summarize_corpus(corpus, measure=content_length if args.measure else None)
+    print(json.dumps(summary, indent=4))
+    if summary['estimated_suffix_bytes']:
+        saved = 1 - summary['estimated_eligible_bytes'] / summary['estimated_suffix_bytes']
+        print(f"Estimated download reduction (from pixel counts): {saved:.0%}")
+    if summary.get('measured_suffix_bytes'):
+        saved = 1 - summary['measured_eligible_bytes'] / summary['measured_suffix_bytes']
+        print(f"Measured download reduction (Content-Length): {saved:.0%}")
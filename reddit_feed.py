@@ -0,0 +1,257 @@
+import base64
+import binascii
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import caption_engine
+import media_eligibility
+import resilience
+
+MEDIA_TYPES = ('image', 'gallery', 'video', 'any')
+RANKINGS = ('hot', 'score', 'new', 'velocity')
+
+# Width of the preview rendition used for dashboard cards
+DEFAULT_THUMBNAIL_WIDTH = 640
+MAX_PAGE_SIZE = 50
+MAX_WORKERS = 8
+
+
+def encode_cursor(afters):
+    """
+    Encode a {subreddit: after} mapping as an opaque cursor string
+
+    An after of '' means start from the top of the listing and None means the
+    subreddit is exhausted. Returns None when every subreddit is exhausted.
+    """
+    if all(after is None for after in afters.values()):
+        return None
+    raw = json.dumps(afters, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Returns:
+        Dictionary of subreddit -> after fullname, or None if the cursor is invalid
+    """
+    if not cursor:
+        return {}
+    if not isinstance(cursor, str):
+        return None
+    try:
+        afters = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(afters, dict):
+        return None
+    return afters
+
+
+def get_thumbnail(post, width=DEFAULT_THUMBNAIL_WIDTH):
+    """
+    Pick the smallest Reddit preview rendition at least `width` pixels wide
+
+    Falls back to the largest rendition, then to Reddit's own thumbnail, then
+    to the original URL when the listing has no preview data.
+    """
+    renditions = media_eligibility.get_renditions(post)
+    if renditions:
+        wide_enough = [r for r in renditions if r['width'] >= width]
+        return wide_enough[0]['url'] if wide_enough else renditions[-1]['url']
+
+    thumbnail = media_eligibility.get_field(post, 'thumbnail', '')
+    if isinstance(thumbnail, str) and thumbnail.startswith('http'):
+        return thumbnail
+    return media_eligibility.get_field(post, 'url')
+
+
+def serialize_post(post, subreddit_name, thumbnail_width=DEFAULT_THUMBNAIL_WIDTH):
+    """
+    Convert a praw submission into the JSON shape used by the dashboard
+
+    Only fields already present in the listing are read, so serializing a
+    page never triggers praw's lazy per-submission fetch.
+    """
+    field = media_eligibility.get_field
+    eligibility = media_eligibility.check_eligibility(post)
+    return {
+        'title': field(post, 'title'),
+        'url': field(post, 'url'),
+        'download_url': eligibility['source']['url'] if eligibility['source'] else field(post, 'url'),
+        'thumbnail': get_thumbnail(post, thumbnail_width),
+        'media_type': eligibility['media_type'],
+        'eligible': eligibility['eligible'],
+        'ineligible_reason': eligibility['reason'],
+        'score': field(post, 'score'),
+        'id': field(post, 'id'),
+        'author': str(field(post, 'author')),
+        'subreddit': subreddit_name,
+        'created_utc': field(post, 'created_utc'),
+        'permalink': f"https://reddit.com{field(post, 'permalink')}",
+        'caption': caption_engine.build_caption(subreddit_name, field(post, 'title'))[0]
+    }
+
+
+def matches_filters(post, filters, posted_ids=(), now=None):
+    """
+    Check a serialized post against the feed filters
+
+    Args:
+        post: Dictionary produced by serialize_post
+        filters: Dictionary with optional media_type, min_score, max_age_hours,
+                 exclude_posted and eligible_only keys. eligible_only defaults
+                 to True for images, dropping posts Instagram would reject
+        posted_ids: Ids of posts that have already been published
+        now: Current unix time, defaults to time.time()
+    """
+    media_type = filters.get('media_type', 'image')
+    if media_type != 'any' and post['media_type'] != media_type:
+        return False
+
+    if filters.get('eligible_only', media_type == 'image') and not post['eligible']:
+        return False
+
+    min_score = filters.get('min_score')
+    if min_score is not None and post['score'] < min_score:
+        return False
+
+    max_age_hours = filters.get('max_age_hours')
+    if max_age_hours is not None:
+        now = time.time() if now is None else now
+        if now - post['created_utc'] > max_age_hours * 3600:
+            return False
+
+    if filters.get('exclude_posted', True) and post['id'] in posted_ids:
+        return False
+
+    return True
+
+
+def rank_posts(posts, ranking='hot', now=None):
+    """
+    Order serialized posts
+
+    'hot' keeps Reddit's listing order, 'score' and 'new' sort by score and
+    creation time, and 'velocity' favours posts gaining score quickly.
+    """
+    if ranking == 'score':
+        return sorted(posts, key=lambda p: p['score'], reverse=True)
+    if ranking == 'new':
+        return sorted(posts, key=lambda p: p['created_utc'], reverse=True)
+    if ranking == 'velocity':
+        now = time.time() if now is None else now
+
+        def velocity(post):
+            age_hours = max(0.0, now - post['created_utc']) / 3600
+            return post['score'] / (age_hours + 2) ** 1.5
+
+        return sorted(posts, key=velocity, reverse=True)
+    return list(posts)
+
+
+def merge_pages(pages, subreddits, ranking='hot', now=None):
+    """
+    Merge per-subreddit pages into one deterministically ordered list
+
+    Args:
+        pages: Dictionary of subreddit -> serialized posts in listing order
+        subreddits: Requested subreddit order, used to break ties
+
+    'hot' interleaves the listings by position (first post of each subreddit,
+    then the second, ...); other rankings sort the merged posts with rank_posts.
+    """
+    ordered = [pages.get(s, []) for s in subreddits]
+    if ranking != 'hot':
+        return rank_posts([p for page in ordered for p in page], ranking, now)
+    merged = []
+    for position in range(max((len(page) for page in ordered), default=0)):
+        merged.extend(page[position] for page in ordered if position < len(page))
+    return merged
+
+
+def fetch_subreddit_page(reddit, subreddit_name, after=None, limit=10,
+                         thumbnail_width=DEFAULT_THUMBNAIL_WIDTH):
+    """
+    Fetch one page of a subreddit's hot listing
+
+    Returns:
+        Tuple of (serialized posts, fullname to continue after or None when exhausted)
+    """
+    subreddit = reddit.subreddit(subreddit_name)
+    params = {'after': after} if after else {}
+    listing = resilience.call_with_retry(
+        lambda: list(subreddit.hot(limit=limit, params=params)),
+        host='reddit',
+        retries=resilience.REDDIT_RETRIES,
+        retry_on=resilience.REDDIT_ERRORS
+    )
+    posts = [serialize_post(post, subreddit_name, thumbnail_width) for post in listing]
+    next_after = listing[-1].fullname if listing and len(listing) >= limit else None
+    return posts, next_after
+
+
+def stream_feed(make_reddit, subreddits, afters, limit, filters, posted_ids=(),
+                ranking='hot', thumbnail_width=DEFAULT_THUMBNAIL_WIDTH):
+    """
+    Fetch a page from every subreddit concurrently and yield events as each one completes
+
+    praw clients are not thread-safe, so make_reddit is called once per worker thread.
+    Each 'posts' event is ranked on its own; callers merging events are
+    responsible for ranking across subreddits (merge_pages does this for a
+    whole page, and the dashboard re-ranks the cards not yet viewed as events
+    arrive).
+
+    Yields dictionaries of the form
+        {'type': 'posts', 'subreddit': ..., 'posts': [...]}
+        {'type': 'error', 'subreddit': ..., 'message': ...}
+        {'type': 'end', 'cursor': ..., 'elapsed_ms': ...}
+    """
+    started = time.monotonic()
+    local = threading.local()
+
+    def fetch(subreddit_name):
+        if not hasattr(local, 'reddit'):
+            local.reddit = make_reddit()
+        return fetch_subreddit_page(
+            local.reddit, subreddit_name, afters.get(subreddit_name) or None, limit, thumbnail_width
+        )
+
+    # Subreddits that were exhausted on a previous page are skipped
+    pending = [s for s in subreddits if afters.get(s, '') is not None]
+    next_afters = {s: None for s in subreddits}
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(pending))) as executor:
+            futures = {executor.submit(fetch, s): s for s in pending}
+            for future in as_completed(futures):
+                subreddit_name = futures[future]
+                try:
+                    posts, next_after = future.result()
+                except Exception as e:
+                    # Keep the old position so the next page retries this subreddit
+                    next_afters[subreddit_name] = afters.get(subreddit_name, '')
+                    yield {
+                        'type': 'error',
+                        'subreddit': subreddit_name,
+                        'message': f'Error fetching posts from r/{subreddit_name}: {str(e)}'
+                    }
+                    continue
+
+                next_afters[subreddit_name] = next_after
+                now = time.time()
+                posts = [p for p in posts if matches_filters(p, filters, posted_ids, now)]
+                yield {
+                    'type': 'posts',
+                    'subreddit': subreddit_name,
+                    'posts': rank_posts(posts, ranking, now)
+                }
+
+    yield {
+        'type': 'end',
+        'cursor': encode_cursor(next_afters),
+        'elapsed_ms': round((time.monotonic() - started) * 1000)
+    }
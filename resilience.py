@@ -0,0 +1,264 @@
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import openai
+import prawcore
+import requests
+from instagrapi import exceptions as instagrapi_exceptions
+
+# HTTP statuses worth retrying: rate limiting and server-side failures
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+# Exceptions raised by requests that indicate a transient network problem
+TRANSIENT_HTTP_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.HTTPError,
+)
+
+# Transient failures from the Reddit API (network errors, 5xx, rate limiting)
+REDDIT_ERRORS = (
+    prawcore.exceptions.RequestException,
+    prawcore.exceptions.ServerError,
+    prawcore.exceptions.TooManyRequests,
+)
+
+# prawcore already retries 5xx and connection errors itself, so Reddit calls
+# only go through the circuit breaker here instead of stacking another retry loop
+REDDIT_RETRIES = 0
+
+# Instagram network failures. Only retried for idempotent calls such as login;
+# a dropped connection during photo_upload may still have published the post.
+# instagrapi's upload helpers call requests directly, so raw requests errors
+# are listed as well.
+INSTAGRAM_ERRORS = (
+    instagrapi_exceptions.ClientConnectionError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+)
+
+# Instagram throttling needs minutes to clear, so it opens the circuit
+# immediately for INSTAGRAM_THROTTLE_COOLDOWN seconds instead of being retried
+INSTAGRAM_THROTTLE_ERRORS = (
+    instagrapi_exceptions.ClientThrottledError,
+    instagrapi_exceptions.PleaseWaitFewMinutes,
+)
+INSTAGRAM_THROTTLE_COOLDOWN = 600
+
+# Transient failures from the OpenAI API
+OPENAI_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+DEFAULT_TIMEOUT = 15
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the dependency's circuit is open"""
+
+    def __init__(self, host, retry_in):
+        self.host = host
+        self.retry_in = retry_in
+        super().__init__(f"Circuit open for {host}, retry in {retry_in:.0f}s")
+
+
+class RetryBudget:
+    """
+    Token bucket that limits retries to a fraction of normal traffic.
+
+    Every call deposits `ratio` tokens and every retry withdraws one, so a
+    failing dependency can never see more than roughly (1 + ratio) times its
+    usual load from us.
+    """
+
+    def __init__(self, ratio=0.2, min_tokens=10, max_tokens=100):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail immediately for `reset_timeout` seconds. After that a single trial
+    call is let through (half-open); success closes the circuit again.
+    trip() opens the circuit straight away, e.g. when the dependency asks us
+    to back off.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, host, failure_threshold=5, reset_timeout=60):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.open_for = reset_timeout
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call should not be attempted"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == self.OPEN and elapsed >= self.open_for:
+                self.state = self.HALF_OPEN
+                return
+            raise CircuitOpenError(self.host, max(0.0, self.open_for - elapsed))
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.open_for = self.reset_timeout
+
+    def release(self):
+        """
+        Give up a half-open trial without judging the dependency
+
+        Used when the trial call failed in a way that says nothing about the
+        dependency's health, so the next call is allowed to try again.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic() - self.open_for
+
+    def trip(self, cooldown=None):
+        """Open the circuit immediately for `cooldown` seconds (default reset_timeout)"""
+        with self._lock:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.open_for = self.reset_timeout if cooldown is None else cooldown
+
+
+_breakers = {}
+_budgets = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(host):
+    """Return the shared circuit breaker for a host, creating it on first use"""
+    with _registry_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host)
+        return _breakers[host]
+
+
+def get_budget(host):
+    """Return the shared retry budget for a host, creating it on first use"""
+    with _registry_lock:
+        if host not in _budgets:
+            _budgets[host] = RetryBudget()
+        return _budgets[host]
+
+
+def reset():
+    """Forget all breaker and budget state"""
+    with _registry_lock:
+        _breakers.clear()
+        _budgets.clear()
+
+
+def backoff_delay(attempt, base_delay=0.5, max_delay=8.0):
+    """Full-jitter exponential backoff: uniform in [0, min(max, base * 2^attempt)]"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_retry(func, *args, host, retries=3, retry_on=TRANSIENT_HTTP_ERRORS,
+                    trip_on=(), trip_cooldown=None, base_delay=0.5, max_delay=8.0, **kwargs):
+    """
+    Call func(*args, **kwargs) guarded by the host's circuit breaker and retry budget
+
+    Args:
+        func: Callable to invoke
+        host: Name of the dependency, used to share breaker and budget state
+        retries: Maximum number of retries after the first attempt
+        retry_on: Exception types that count as transient failures
+        trip_on: Exception types that open the circuit at once without retrying
+        trip_cooldown: Seconds the circuit stays open after a trip_on exception
+        base_delay: Backoff base in seconds
+        max_delay: Upper bound for a single backoff sleep
+
+    Returns:
+        Whatever func returns
+
+    Raises:
+        CircuitOpenError if the host's circuit is open, otherwise the last
+        exception raised by func. Exceptions not listed in retry_on or
+        trip_on are raised immediately and leave the circuit unchanged.
+    """
+    breaker = get_breaker(host)
+    budget = get_budget(host)
+    budget.deposit()
+
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except trip_on:
+            breaker.trip(trip_cooldown)
+            raise
+        except retry_on:
+            breaker.record_failure()
+            if attempt >= retries or not budget.withdraw():
+                raise
+        except Exception:
+            # Unclassified failures say nothing about the dependency's health
+            breaker.release()
+            raise
+        else:
+            breaker.record_success()
+            return result
+
+        time.sleep(backoff_delay(attempt, base_delay, max_delay))
+        attempt += 1
+
+
+def _get_checked(url, **kwargs):
+    response = requests.get(url, **kwargs)
+    if response.status_code in RETRYABLE_STATUS:
+        response.raise_for_status()
+    return response
+
+
+def resilient_get(url, retries=3, **kwargs):
+    """
+    requests.get with retries, backoff and a circuit breaker keyed on the URL's host
+
+    429 and 5xx responses are retried; other statuses are returned to the caller.
+    """
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    host = urlparse(url).netloc or url
+    return call_with_retry(_get_checked, url, host=host, retries=retries, **kwargs)
@@ -39,6 +39,11 @@ class DashboardManager {
         this.currentIndex = 0;
         this.approvedPosts = [];
         this.isLoading = false;
+        this.nextCursor = null;
+        this.feedBytes = 0;
+        this.imageBytes = 0;
+        this.measuredImages = new Set();
+        this.unmeasuredImages = 0;
 
         this.initializeEventListeners();
     }
@@ -46,6 +51,8 @@ class DashboardManager {
     initializeEventListeners() {
         // Fetch posts button
         document.getElementById('fetch-posts').addEventListener('click', () => this.fetchPosts());
+        document.getElementById('load-more-posts').addEventListener('click', () => this.fetchPosts(true));
+        document.getElementById('post-media').addEventListener('load', (e) => this.recordImageBytes(e.target.currentSrc));
 
         // Navigation buttons
         document.getElementById('prev-post').addEventListener('click', () => this.prevPost('prev'));
@@ -97,11 +104,19 @@ class DashboardManager {
         document.getElementById('post-subreddit').textContent = `r/${post.subreddit}`;
         document.getElementById('post-author').textContent = `u/${post.author}`;
         document.getElementById('post-score').textContent = `${post.score} points`;
-        document.getElementById('post-media').src = post.url;
+        // Cards use Reddit's downsized preview; the original is only fetched when posting
+        document.getElementById('post-media').src = post.thumbnail || post.url;
 
         document.getElementById('caption-editor').value = this.generateDefaultCaption(post);
         this.updateCharCount();
 
+        // Galleries, videos and other ineligible posts can be browsed but not posted
+        const ineligibleBadge = document.getElementById('post-ineligible');
+        const postable = this.isPostable(post);
+        ineligibleBadge.classList.toggle('d-none', postable);
+        ineligibleBadge.textContent = postable ? '' : `Cannot post: ${post.ineligible_reason || post.media_type}`;
+        document.getElementById('approve-post').disabled = !postable;
+
         // Update navigation buttons
         document.getElementById('prev-post').disabled = index === 0;
         document.getElementById('next-post').disabled = index === this.currentPosts.length - 1;
@@ -167,7 +182,9 @@ class DashboardManager {
         }, 5000);
     }
 
-    async fetchPosts() {
+    async fetchPosts(loadMore = false) {
+        if (this.isLoading) return;
+
         try {
             this.showLoading('Fetching posts...');
 
@@ -178,28 +195,80 @@ class DashboardManager {
                 throw new Error('Please select at least one subreddit');
             }
 
-            const response = await fetch('/fetch-posts', {
+            if (!loadMore) {
+                this.currentPosts = [];
+                this.currentIndex = 0;
+                this.nextCursor = null;
+                this.feedBytes = 0;
+                this.imageBytes = 0;
+                this.measuredImages.clear();
+                this.unmeasuredImages = 0;
+            }
+            const startCount = this.currentPosts.length;
+            const startedAt = performance.now();
+            const ranking = document.getElementById('filter-ranking').value;
+
+            const response = await fetch('/feed', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({subreddits: selectedSubreddits})
+                body: JSON.stringify({
+                    subreddits: selectedSubreddits,
+                    cursor: loadMore ? this.nextCursor : null,
+                    media_type: document.getElementById('filter-media-type').value,
+                    min_score: document.getElementById('filter-min-score').value,
+                    max_age_hours: document.getElementById('filter-max-age').value,
+                    ranking: ranking,
+                    exclude_posted: document.getElementById('filter-exclude-posted').checked,
+                    stream: true
+                })
             });
 
             if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
+                const data = await response.json().catch(() => ({}));
+                throw new Error(data.error || `HTTP error! status: ${response.status}`);
             }
 
-            const data = await response.json();
+            let firstCardMs = null;
+
+            await this.readFeedStream(response, (event, byteLength) => {
+                this.feedBytes += byteLength;
+
+                if (event.type === 'posts' && event.posts.length) {
+                    // The server ranks each subreddit's chunk on its own, so re-rank
+                    // every card the user has not reached yet across subreddits
+                    const keep = firstCardMs === null ? startCount : this.currentIndex + 1;
+                    const pending = this.currentPosts.slice(keep).concat(event.posts);
+                    this.currentPosts = this.currentPosts.slice(0, keep).concat(this.rankPosts(pending, ranking));
+                    this.updatePostsCount();
+
+                    // Render the first card as soon as any subreddit answers
+                    if (firstCardMs === null) {
+                        firstCardMs = Math.round(performance.now() - startedAt);
+                        this.hideLoading();
+                        this.isLoading = true;
+                        this.showPost(loadMore ? startCount : 0);
+                    } else {
+                        // More posts arrived behind the current card
+                        document.getElementById('next-post').disabled = false;
+                    }
+                } else if (event.type === 'error') {
+                    this.showToast(event.message, 'danger');
+                } else if (event.type === 'end') {
+                    this.nextCursor = event.cursor;
+                }
+            });
 
-            if (data.error) {
-                throw new Error(data.error);
-            }
+            document.getElementById('feed-first-card-ms').textContent = firstCardMs === null ? '-' : `${firstCardMs} ms`;
+            this.updateBytesDisplay();
+            document.getElementById('load-more-posts').disabled = !this.nextCursor;
 
-            this.currentPosts = data.posts;
-            this.updatePostsCount();
-            this.showToast(`Successfully fetched ${data.posts.length} posts`);
-            this.showPost(this.currentIndex);
+            const fetched = this.currentPosts.length - startCount;
+            this.showToast(`Successfully fetched ${fetched} posts`);
+            if (fetched === 0) {
+                this.showPost(this.currentIndex);
+            }
 
         } catch (error) {
             this.showToast(error.message, 'danger');
@@ -209,6 +278,80 @@ class DashboardManager {
         }
     }
 
+    recordImageBytes(url) {
+        // Card images are the bulk of what the browser downloads, so count them
+        // from Resource Timing. Cross-origin sizes read as 0 unless the CDN
+        // sends Timing-Allow-Origin; those images are counted as unmeasured.
+        if (!url || this.measuredImages.has(url)) return;
+        this.measuredImages.add(url);
+
+        const entries = performance.getEntriesByName(url, 'resource');
+        const entry = entries[entries.length - 1];
+        const bytes = entry ? (entry.transferSize || entry.encodedBodySize) : 0;
+        if (bytes) {
+            this.imageBytes += bytes;
+        } else {
+            this.unmeasuredImages += 1;
+        }
+        this.updateBytesDisplay();
+    }
+
+    updateBytesDisplay() {
+        const kb = bytes => `${(bytes / 1024).toFixed(1)} KB`;
+        document.getElementById('feed-bytes').textContent = kb(this.feedBytes);
+
+        const measured = this.measuredImages.size - this.unmeasuredImages;
+        let images = measured ? `${kb(this.imageBytes)} (${measured} images)` : '-';
+        if (this.unmeasuredImages) {
+            images += `, ${this.unmeasuredImages} unmeasured`;
+        }
+        document.getElementById('feed-image-bytes').textContent = images;
+    }
+
+    rankPosts(posts, ranking) {
+        // Mirrors reddit_feed.rank_posts; 'hot' keeps arrival order
+        const now = Date.now() / 1000;
+        const velocity = post => post.score / Math.pow(Math.max(0, now - post.created_utc) / 3600 + 2, 1.5);
+
+        if (ranking === 'score') {
+            return [...posts].sort((a, b) => b.score - a.score);
+        }
+        if (ranking === 'new') {
+            return [...posts].sort((a, b) => b.created_utc - a.created_utc);
+        }
+        if (ranking === 'velocity') {
+            return [...posts].sort((a, b) => velocity(b) - velocity(a));
+        }
+        return posts;
+    }
+
+    async readFeedStream(response, onEvent) {
+        // Parse the NDJSON feed line by line as chunks arrive
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        const encoder = new TextEncoder();
+        let buffer = '';
+
+        while (true) {
+            const {done, value} = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, {stream: true});
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+
+            for (const line of lines) {
+                if (line.trim()) {
+                    onEvent(JSON.parse(line), encoder.encode(line).length + 1);
+                }
+            }
+        }
+
+        if (buffer.trim()) {
+            onEvent(JSON.parse(buffer), encoder.encode(buffer).length);
+        }
+    }
+
     addToQueue(post) {
         const tbody = document.getElementById('queue-table-body');
         const row = document.createElement('tr');
@@ -255,7 +398,12 @@ class DashboardManager {
             const result = await response.json();
             if (result.status === 'success') {
                 this.updateQueueItemStatus(row, 'success');
-                this.showToast('Successfully posted to Instagram');
+                if (result.warning) {
+                    console.warn(result.warning);
+                    this.showToast(`Successfully posted to Instagram (${result.warning})`);
+                } else {
+                    this.showToast('Successfully posted to Instagram');
+                }
             } else {
                 throw new Error(result.message);
             }
@@ -269,9 +417,15 @@ class DashboardManager {
         }
     }
 
+    isPostable(post) {
+        // Only single images can go through /post-to-instagram
+        return post.eligible !== false;
+    }
+
     async handlePostApproval() {
         try {
             const post = this.currentPosts[this.currentIndex];
+            if (!this.isPostable(post)) return;
             this.showLoading('Processing approval...');
 
             // Add to approved posts
@@ -312,7 +466,8 @@ class DashboardManager {
     }
 
     generateDefaultCaption(post) {
-        return `${post.title} 🔥🔥🔥 #viral #fyp`;
+        // The feed renders captions server-side from the subreddit's template
+        return post.caption || `${post.title} 🔥🔥🔥 #viral #fyp`;
     }
 
     updatePostsCount() {
@@ -377,7 +532,11 @@ class DashboardManager {
                 this.updateContentAnalysis(result.analysis);
             }
             
-            this.showToast('Content successfully optimized by AI');
+            if (result.caption_source === 'local') {
+                this.showToast('Caption built from the subreddit template');
+            } else {
+                this.showToast('Content successfully optimized by AI');
+            }
             
         } catch (error) {
             this.showToast(error.message, 'danger');
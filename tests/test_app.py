@@ -0,0 +1,108 @@
+import io
+import json
+
+import pytest
+from flask.sessions import SecureCookieSessionInterface
+from PIL import Image
+
+import app as dashboard_app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    dashboard_app.app.config['TESTING'] = True
+    # Keep test sessions out of the filesystem session directory
+    monkeypatch.setattr(dashboard_app.app, 'session_interface', SecureCookieSessionInterface())
+    with dashboard_app.app.test_client() as client:
+        yield client
+
+
+def test_ineligible_posts_are_refused_before_download(client):
+    response = client.post('/post-to-instagram', json={
+        'id': 'abc',
+        'url': 'https://www.reddit.com/gallery/abc',
+        'media_type': 'gallery',
+        'eligible': False,
+        'ineligible_reason': 'gallery',
+    })
+
+    assert response.status_code == 400
+    assert 'gallery' in response.get_json()['message']
+
+
+def test_feed_rejects_non_string_cursor(client):
+    response = client.post('/feed', json={'subreddits': ['mma'], 'cursor': 5})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid cursor'
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeInstagram:
+    uploads = []
+
+    def login(self, username, password):
+        pass
+
+    def photo_upload(self, path, caption):
+        FakeInstagram.uploads.append(caption)
+
+    def logout(self):
+        pass
+
+
+def test_history_write_failure_does_not_fail_a_published_post(client, tmp_path, monkeypatch):
+    image = io.BytesIO()
+    Image.new('RGB', (10, 10)).save(image, 'JPEG')
+    (tmp_path / 'config.json').write_text(
+        json.dumps({'instagram': {'instagram_username': 'u', 'instagram_password': 'p'}})
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dashboard_app.resilience, 'resilient_get', lambda url: FakeResponse(image.getvalue()))
+    monkeypatch.setattr(dashboard_app, 'Client', FakeInstagram)
+
+    def failing_record_post(*args):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(dashboard_app.caption_engine, 'record_post', failing_record_post)
+
+    response = client.post('/post-to-instagram', json={
+        'id': 'abc',
+        'title': 'Title',
+        'subreddit': 'ufc',
+        'url': 'https://i.redd.it/abc.jpg',
+        'caption': 'Title #ufc #custom',
+    })
+
+    assert response.status_code == 200
+    assert response.get_json()['warning'] == 'Hashtag history not updated: disk full'
+    assert FakeInstagram.uploads == ['Title #ufc #custom']
+
+
+def test_optimize_content_uses_local_caption_when_confident(client, monkeypatch):
+    def llm(*args):
+        raise AssertionError("LLM called for a confident caption")
+
+    monkeypatch.setattr(dashboard_app.ai_content_optimizer, 'client', object())
+    monkeypatch.setattr(dashboard_app.ai_content_optimizer, 'optimize_caption', llm)
+    monkeypatch.setattr(dashboard_app.ai_content_optimizer, 'generate_hashtags', llm)
+
+    response = client.post('/optimize-content', json={
+        'title': 'Brutal KO in UFC boxing',
+        'subreddit': 'ufc',
+        'caption': 'Brutal KO in UFC boxing',
+        'generate_hashtags': True,
+    })
+
+    result = response.get_json()
+    assert response.status_code == 200
+    assert (result['caption_source'], result['hashtag_source']) == ('local', 'local')
+    assert result['optimized_caption'].startswith('Brutal KO in UFC boxing')
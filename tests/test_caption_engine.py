@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+import caption_engine
+
+
+@pytest.fixture(autouse=True)
+def fresh_engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(caption_engine, 'CONFIG_FILE', str(tmp_path / 'config.json'))
+    monkeypatch.setattr(caption_engine, 'HISTORY_FILE', str(tmp_path / 'hashtag_history.json'))
+    monkeypatch.setattr(caption_engine, 'stats', {'local': 0, 'llm': 0})
+    caption_engine.initialize()
+
+
+def test_seed_set_alone_is_not_confident():
+    hashtags, confidence = caption_engine.select_hashtags('ufc', 'asdf qwerty zzz')
+
+    assert confidence < caption_engine.CONFIDENCE_THRESHOLD
+    assert '#ufc' in hashtags
+
+
+def test_title_matching_seed_vocabulary_is_confident():
+    hashtags, confidence = caption_engine.select_hashtags('ufc', 'Brutal KO in UFC boxing')
+
+    assert confidence >= caption_engine.CONFIDENCE_THRESHOLD
+    assert set(hashtags.split()[:3]) == {'#ko', '#ufc', '#boxing'}
+
+
+def test_low_confidence_falls_back_to_llm():
+    calls = []
+
+    def llm(subreddit, title, caption, count):
+        calls.append(title)
+        return '#fromllm'
+
+    hashtags, source = caption_engine.hashtags_with_fallback('ufc', 'asdf qwerty zzz', '', llm=llm)
+
+    assert (hashtags, source) == ('#fromllm', 'llm')
+    assert calls == ['asdf qwerty zzz']
+    assert caption_engine.get_stats() == {'local': 0, 'llm': 1, 'llm_calls_avoided': 0}
+
+
+def test_shipped_subreddit_templates_are_used():
+    caption, _ = caption_engine.build_caption('MMAmemes', 'Every Conor tweet be like')
+
+    assert caption.startswith('Every Conor tweet be like 😂😂😂')
+    assert 'via r/mmamemes' in caption
+    assert caption_engine.build_caption('aww', 'Cat')[0].startswith('Cat 🔥🔥🔥\n\n#')
+
+
+def test_confident_caption_skips_the_llm():
+    def llm(*args):
+        raise AssertionError("LLM called for a confident caption")
+
+    caption, source = caption_engine.caption_with_fallback('ufc', 'Brutal KO in UFC boxing', '', llm=llm)
+
+    assert source == 'local'
+    assert caption_engine.get_stats()['llm_calls_avoided'] == 1
+    assert caption == caption_engine.build_caption('ufc', 'Brutal KO in UFC boxing')[0]
+
+
+def test_unknown_title_caption_uses_the_llm():
+    caption, source = caption_engine.caption_with_fallback(
+        'ufc', 'asdf qwerty zzz', 'draft', 'heavy', llm=lambda *args: ' | '.join(args)
+    )
+
+    assert (caption, source) == ('draft | ufc | asdf qwerty zzz | heavy', 'llm')
+
+
+def test_record_post_ignores_engine_generated_tags(tmp_path):
+    caption, _ = caption_engine.build_caption('ufc', 'Brutal KO in UFC boxing')
+
+    assert caption_engine.record_post('ufc', 'Brutal KO in UFC boxing', caption) is False
+    assert not (tmp_path / 'hashtag_history.json').exists()
+
+
+def test_record_post_learns_user_added_tags(tmp_path):
+    caption, _ = caption_engine.build_caption('aww', 'My cat learned a trick')
+
+    assert caption_engine.record_post('aww', 'My cat learned a trick', caption + ' #cats #aww')
+
+    history = json.loads((tmp_path / 'hashtag_history.json').read_text())
+    assert history == [{'subreddit': 'aww', 'title': 'My cat learned a trick', 'hashtags': ['#cats', '#aww']}]
+    hashtags, confidence = caption_engine.select_hashtags('aww', 'Cat trick')
+    assert hashtags.split()[:2] == ['#cats', '#aww']
+    assert confidence >= caption_engine.CONFIDENCE_THRESHOLD
+
+
+def test_learned_subreddit_is_not_confident_for_unrelated_titles():
+    caption_engine.record_post('aww', 'My cat learned a trick', '#cats #aww')
+
+    _, confidence = caption_engine.select_hashtags('aww', 'Sunset over the harbour')
+
+    assert confidence < caption_engine.CONFIDENCE_THRESHOLD
@@ -0,0 +1,129 @@
+import glob
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import praw
+import pytest
+
+import media_eligibility
+import resilience
+
+LISTINGS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'fixtures', 'listings', '*.json')))
+
+
+def image_post(width, height, **fields):
+    post = {
+        'url': 'https://i.redd.it/abc.jpg',
+        'author': 'someone',
+        'post_hint': 'image',
+        'preview': {'images': [{
+            'source': {'url': 'https://preview.redd.it/abc.jpg?s=src', 'width': width, 'height': height},
+            'resolutions': [
+                {'url': f'https://preview.redd.it/abc.jpg?width={w}&amp;s=x', 'width': w, 'height': round(height * w / width)}
+                for w in (320, 640, 1080) if w < width
+            ],
+        }]},
+    }
+    post.update(fields)
+    return post
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    resilience.reset()
+
+
+@pytest.mark.parametrize('fields, reason', [
+    ({'over_18': True}, 'nsfw'),
+    ({'removed_by_category': 'moderator'}, 'removed'),
+    ({'author': '[deleted]'}, 'removed'),
+    ({'is_gallery': True}, 'gallery'),
+    ({'is_video': True, 'url': 'https://v.redd.it/abc', 'post_hint': 'hosted:video'}, 'not_image'),
+])
+def test_unwanted_posts_are_rejected(fields, reason):
+    result = media_eligibility.check_eligibility(image_post(2000, 2000, **fields))
+
+    assert not result['eligible']
+    assert result['reason'] == reason
+
+
+@pytest.mark.parametrize('width, height, reason', [
+    (250, 250, 'too_small'),
+    (1170, 2532, 'aspect_ratio'),
+    (2400, 1000, 'aspect_ratio'),
+])
+def test_posts_instagram_would_refuse_are_rejected(width, height, reason):
+    assert media_eligibility.check_eligibility(image_post(width, height))['reason'] == reason
+
+
+def test_large_image_downloads_1080_rendition():
+    result = media_eligibility.check_eligibility(image_post(3000, 3000))
+
+    assert result['eligible']
+    assert result['source'] == {'url': 'https://preview.redd.it/abc.jpg?width=1080&s=x', 'width': 1080, 'height': 1080}
+
+
+def test_small_image_downloads_original():
+    result = media_eligibility.check_eligibility(image_post(800, 800))
+
+    assert result['source']['url'] == 'https://i.redd.it/abc.jpg'
+
+
+def test_submissions_are_classified_without_fetching(monkeypatch):
+    def fetch(self):
+        raise AssertionError(f"lazy fetch of {self.id}")
+
+    monkeypatch.setattr(praw.models.Submission, '_fetch', fetch)
+    reddit = praw.Reddit(client_id='id', client_secret='secret', user_agent='tests')
+    listing = media_eligibility.load_listing(LISTINGS[0])
+    submissions = [praw.models.Submission(reddit, _data=dict(post)) for post in listing]
+
+    results = [media_eligibility.check_eligibility(submission) for submission in submissions]
+
+    assert results == [media_eligibility.check_eligibility(post) for post in listing]
+
+
+def test_illustrative_corpus_summary_over_synthetic_listings():
+    # The fixture posts are hand-made, not recorded, so these counts only pin
+    # the summary logic down; they are not a measurement of real listings
+    corpus = [post for path in LISTINGS for post in media_eligibility.load_listing(path)]
+
+    summary = media_eligibility.summarize_corpus(corpus)
+
+    assert summary['posts'] == 75
+    assert summary['suffix_downloads'] == 57
+    assert summary['eligible_downloads'] == 36
+    # Only size and aspect ratio rejections count as refused uploads
+    assert summary['rejected_uploads_avoided'] == (
+        summary['rejected']['too_small'] + summary['rejected']['aspect_ratio']
+    )
+    assert summary['estimated_eligible_bytes'] < summary['estimated_suffix_bytes']
+
+
+class LengthHandler(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '1000' if 'preview' in self.path else '5000')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_measured_bytes_use_content_length():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), LengthHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+    try:
+        post = image_post(3000, 3000, url=f'{base}/original.jpg')
+        post['preview']['images'][0]['resolutions'][-1]['url'] = f'{base}/preview.jpg'
+
+        summary = media_eligibility.summarize_corpus([post], measure=media_eligibility.content_length)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert summary['measured_suffix_bytes'] == 5000
+    assert summary['measured_eligible_bytes'] == 1000
+    assert summary['unmeasured_downloads'] == 0
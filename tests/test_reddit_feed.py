@@ -0,0 +1,122 @@
+import os
+
+import praw
+import pytest
+
+import media_eligibility
+import reddit_feed
+import resilience
+
+LISTING = os.path.join(os.path.dirname(__file__), 'fixtures', 'listings', 'synthetic_mma_hot.json')
+
+
+class FakeSubmission:
+    def __init__(self, post_id):
+        self.id = post_id
+        self.fullname = f't3_{post_id}'
+        self.title = f'Post {post_id}'
+        self.url = f'https://i.redd.it/{post_id}.jpg'
+        self.score = 100
+        self.author = 'someone'
+        self.created_utc = 1700000000
+        self.permalink = f'/r/test/comments/{post_id}'
+        self.post_hint = 'image'
+        self.preview = {'images': [{
+            'source': {'url': f'https://i.redd.it/{post_id}.jpg', 'width': 1080, 'height': 1080},
+            'resolutions': [{'url': f'https://preview.redd.it/{post_id}.jpg?width=640&amp;s=x',
+                             'width': 640, 'height': 640}],
+        }]}
+
+
+class FakeSubreddit:
+    def __init__(self, posts):
+        self.posts = posts
+
+    def hot(self, limit, params):
+        return self.posts[:limit]
+
+
+class FakeReddit:
+    def __init__(self, posts):
+        self.posts = posts
+
+    def subreddit(self, name):
+        return FakeSubreddit(self.posts)
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    resilience.reset()
+
+
+def test_cursor_round_trip():
+    afters = {'mma': 't3_abc', 'ufc': None, 'aww': ''}
+
+    assert reddit_feed.decode_cursor(reddit_feed.encode_cursor(afters)) == afters
+
+
+def test_cursor_is_none_when_every_subreddit_is_exhausted():
+    assert reddit_feed.encode_cursor({'mma': None, 'ufc': None}) is None
+
+
+@pytest.mark.parametrize('cursor', [5, ['t3_abc'], {'mma': 't3_abc'}, 'not base64!', 'WzFd'])
+def test_invalid_cursors_are_rejected(cursor):
+    assert reddit_feed.decode_cursor(cursor) is None
+
+
+def test_empty_page_has_no_next_cursor():
+    posts, next_after = reddit_feed.fetch_subreddit_page(FakeReddit([]), 'test', limit=10)
+
+    assert posts == []
+    assert next_after is None
+
+
+def test_full_page_continues_after_last_post():
+    reddit = FakeReddit([FakeSubmission(str(i)) for i in range(3)])
+
+    posts, next_after = reddit_feed.fetch_subreddit_page(reddit, 'test', limit=3)
+
+    assert [p['id'] for p in posts] == ['0', '1', '2']
+    assert next_after == 't3_2'
+    assert posts[0]['thumbnail'] == 'https://preview.redd.it/0.jpg?width=640&s=x'
+
+
+def test_rank_posts_by_score():
+    posts = [{'id': 'a', 'score': 1}, {'id': 'b', 'score': 5}, {'id': 'c', 'score': 3}]
+
+    assert [p['id'] for p in reddit_feed.rank_posts(posts, 'score')] == ['b', 'c', 'a']
+
+
+def test_hot_merge_interleaves_by_listing_position_in_requested_order():
+    pages = {
+        'ufc': [{'id': 'u1'}, {'id': 'u2'}, {'id': 'u3'}],
+        'mma': [{'id': 'm1'}],
+        'aww': [{'id': 'a1'}, {'id': 'a2'}],
+    }
+
+    merged = reddit_feed.merge_pages(pages, ['mma', 'ufc', 'aww'])
+
+    assert [p['id'] for p in merged] == ['m1', 'u1', 'a1', 'u2', 'a2', 'u3']
+
+
+def test_score_merge_breaks_ties_by_requested_order():
+    pages = {'ufc': [{'id': 'u', 'score': 5}], 'mma': [{'id': 'm', 'score': 5}]}
+
+    assert [p['id'] for p in reddit_feed.merge_pages(pages, ['mma', 'ufc'], 'score')] == ['m', 'u']
+
+
+def test_feed_page_never_fetches_submissions(monkeypatch):
+    def fetch(self):
+        raise AssertionError(f"lazy fetch of {self.id}")
+
+    monkeypatch.setattr(praw.models.Submission, '_fetch', fetch)
+    reddit = praw.Reddit(client_id='id', client_secret='secret', user_agent='tests')
+    submissions = [praw.models.Submission(reddit, _data=dict(post))
+                   for post in media_eligibility.load_listing(LISTING)]
+
+    events = list(reddit_feed.stream_feed(
+        lambda: FakeReddit(submissions), ['MMA'], {}, 25, {'media_type': 'any'}
+    ))
+
+    assert [e['type'] for e in events] == ['posts', 'end']
+    assert len(events[0]['posts']) == len(submissions)
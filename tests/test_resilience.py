@@ -0,0 +1,277 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import resilience
+
+
+class StubServer:
+    """
+    Local HTTP server that plays back a script of faults.
+
+    Each request consumes the next entry: an HTTP status code, or 'reset' to
+    drop the connection without answering. Once the script runs out the last
+    entry is repeated.
+    """
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.hits = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                action = stub.next_action()
+                if action == 'reset':
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+                self.send_response(action)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'ok')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.host = f'127.0.0.1:{self.server.server_port}'
+        self.url = f'http://{self.host}/media.jpg'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def next_action(self):
+        with self._lock:
+            self.hits += 1
+            if len(self.script) > 1:
+                return self.script.pop(0)
+            return self.script[0]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    resilience.reset()
+    yield
+    resilience.reset()
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(*script):
+        server = StubServer(script)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def test_retries_transient_statuses_until_success(stub_server):
+    server = stub_server(503, 429, 200)
+
+    response = resilience.resilient_get(server.url, base_delay=0)
+
+    assert response.status_code == 200
+    assert server.hits == 3
+
+
+def test_retries_connection_resets(stub_server):
+    server = stub_server('reset', 'reset', 200)
+
+    response = resilience.resilient_get(server.url, base_delay=0)
+
+    assert response.status_code == 200
+    assert server.hits == 3
+
+
+def test_retries_stop_at_limit(stub_server):
+    server = stub_server(503)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        resilience.resilient_get(server.url, retries=2, base_delay=0)
+
+    assert server.hits == 3
+
+
+def test_non_retryable_status_is_returned_without_retry(stub_server):
+    server = stub_server(404)
+
+    response = resilience.resilient_get(server.url, base_delay=0)
+
+    assert response.status_code == 404
+    assert server.hits == 1
+    assert resilience.get_breaker(server.host).state == resilience.CircuitBreaker.CLOSED
+
+
+def test_empty_retry_budget_stops_retrying(stub_server):
+    server = stub_server(503, 200)
+    resilience.get_budget(server.host).tokens = 0
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        resilience.resilient_get(server.url, retries=3, base_delay=0)
+
+    assert server.hits == 1
+
+
+def test_breaker_opens_after_failure_threshold(stub_server):
+    server = stub_server('reset')
+    breaker = resilience.get_breaker(server.host)
+    breaker.failure_threshold = 3
+
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            resilience.resilient_get(server.url, retries=0)
+
+    assert breaker.state == resilience.CircuitBreaker.OPEN
+    with pytest.raises(resilience.CircuitOpenError):
+        resilience.resilient_get(server.url, retries=0)
+    # The open circuit fails fast without touching the server
+    assert server.hits == 3
+
+
+def test_breaker_half_opens_after_reset_timeout_and_closes_on_success(stub_server):
+    server = stub_server(503, 503, 200)
+    breaker = resilience.get_breaker(server.host)
+    breaker.failure_threshold = 2
+    breaker.reset_timeout = 0.2
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.HTTPError):
+            resilience.resilient_get(server.url, retries=0)
+    with pytest.raises(resilience.CircuitOpenError):
+        resilience.resilient_get(server.url, retries=0)
+
+    threading.Event().wait(0.25)
+    response = resilience.resilient_get(server.url, retries=0)
+
+    assert response.status_code == 200
+    assert breaker.state == resilience.CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+def test_failed_trial_call_reopens_breaker(stub_server):
+    server = stub_server(503)
+    breaker = resilience.get_breaker(server.host)
+    breaker.failure_threshold = 1
+    breaker.reset_timeout = 0.2
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        resilience.resilient_get(server.url, retries=0)
+    threading.Event().wait(0.25)
+    with pytest.raises(requests.exceptions.HTTPError):
+        resilience.resilient_get(server.url, retries=0)
+
+    assert breaker.state == resilience.CircuitBreaker.OPEN
+    with pytest.raises(resilience.CircuitOpenError):
+        resilience.resilient_get(server.url, retries=0)
+    assert server.hits == 2
+
+
+def test_breaker_lets_only_one_trial_call_through_when_half_open():
+    breaker = resilience.CircuitBreaker('host', failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    breaker.before_call()
+
+    assert breaker.state == resilience.CircuitBreaker.HALF_OPEN
+    with pytest.raises(resilience.CircuitOpenError):
+        breaker.before_call()
+
+
+class Throttled(Exception):
+    pass
+
+
+class Transient(Exception):
+    pass
+
+
+def test_trip_on_opens_circuit_without_retrying():
+    calls = []
+
+    def throttled():
+        calls.append(1)
+        raise Throttled()
+
+    with pytest.raises(Throttled):
+        resilience.call_with_retry(
+            throttled, host='stub', retry_on=(Transient,),
+            trip_on=(Throttled,), trip_cooldown=600, base_delay=0
+        )
+
+    assert len(calls) == 1
+    with pytest.raises(resilience.CircuitOpenError) as excinfo:
+        resilience.call_with_retry(throttled, host='stub', retry_on=(Transient,))
+    assert excinfo.value.retry_in > 500
+    assert len(calls) == 1
+
+
+def test_unclassified_exceptions_leave_breaker_state_unchanged():
+    breaker = resilience.get_breaker('stub')
+    breaker.record_failure()
+
+    with pytest.raises(ValueError):
+        resilience.call_with_retry(lambda: int('x'), host='stub', retry_on=(Transient,))
+
+    assert breaker.failures == 1
+    assert breaker.state == resilience.CircuitBreaker.CLOSED
+
+
+def test_unclassified_exception_in_half_open_trial_lets_next_call_try():
+    breaker = resilience.get_breaker('stub')
+    breaker.reset_timeout = 0.2
+    breaker.trip()
+    threading.Event().wait(0.25)
+
+    with pytest.raises(ValueError):
+        resilience.call_with_retry(lambda: int('x'), host='stub', retry_on=(Transient,))
+
+    assert breaker.state == resilience.CircuitBreaker.OPEN
+    assert resilience.call_with_retry(lambda: 'ok', host='stub', retry_on=(Transient,)) == 'ok'
+    assert breaker.state == resilience.CircuitBreaker.CLOSED
+
+
+def test_raw_connection_errors_during_upload_count_as_instagram_failures():
+    def upload():
+        raise requests.exceptions.ConnectionError('connection dropped mid-upload')
+
+    breaker = resilience.get_breaker('instagram')
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            resilience.call_with_retry(
+                upload, host='instagram', retries=0, retry_on=resilience.INSTAGRAM_ERRORS
+            )
+
+    assert breaker.state == resilience.CircuitBreaker.OPEN
+
+
+def test_exceptions_outside_retry_on_are_not_retried_or_counted():
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise ValueError('bad request')
+
+    for _ in range(resilience.get_breaker('stub').failure_threshold + 1):
+        with pytest.raises(ValueError):
+            resilience.call_with_retry(bad_request, host='stub', retry_on=(Transient,), base_delay=0)
+
+    assert len(calls) == resilience.get_breaker('stub').failure_threshold + 1
+    assert resilience.get_breaker('stub').state == resilience.CircuitBreaker.CLOSED
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    delays = [resilience.backoff_delay(10, base_delay=0.5, max_delay=8.0) for _ in range(200)]
+
+    assert all(0 <= delay <= 8.0 for delay in delays)
+    assert len(set(delays)) > 1